@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+# Namespace que guarda os ponteiros (alias -> namespace versionado)
+ALIAS_NAMESPACE = "aliases"
+# Chave de metadata com o texto do chunk (lida pela Lambda FetchContext)
+TEXT_KEY = "text"
+# Tempo mínimo que um namespace substituído é mantido antes de ser removido.
+# Precisa ser maior que o cache de aliases da FetchContext (ALIAS_TTL_SECONDS)
+NAMESPACE_RETENTION_SECONDS = 900
+
+
+def namespace_for(source: str, entity_type: str) -> str:
+    """Nome lógico (alias) do namespace de uma fonte e tipo de entidade"""
+    return f"{source}-{entity_type}"
+
+
+class IndexWriter:
+    """Escreve vetores no Pinecone particionados por namespace
+
+    Os upserts são feitos em lotes de `batch_size` vetores, com até
+    `max_workers` lotes em paralelo. Em uma reconstrução completa os vetores
+    são gravados em um namespace versionado e o alias só passa a apontar para
+    ele depois que todos os lotes foram gravados, então as consultas nunca
+    enxergam um namespace pela metade.
+    """
+
+    def __init__(self, index, batch_size: int = 100, max_workers: int = 4):
+        self.index = index
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._dimension = None
+
+    def upsert(self, records: List[Dict], namespace: str) -> int:
+        """Faz upsert concorrente dos registros em um namespace"""
+        batches = [
+            records[i:i + self.batch_size]
+            for i in range(0, len(records), self.batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self.index.upsert, vectors=batch, namespace=namespace)
+                for batch in batches
+            ]
+            # Propaga a primeira falha, se houver
+            for future in futures:
+                future.result()
+        return len(records)
+
+    def resolve(self, alias: str) -> Optional[Dict]:
+        """Retorna o registro do alias (namespace ativo e aposentados), se existir"""
+        response = self.index.fetch(ids=[alias], namespace=ALIAS_NAMESPACE)
+        vector = response['vectors'].get(alias)
+        return dict(vector['metadata']) if vector else None
+
+    def rebuild(self, alias: str, records: List[Dict]) -> str:
+        """Reconstrói um namespace inteiro e troca o alias atomicamente
+
+        O namespace substituído entra na lista de aposentados do alias e só é
+        removido depois de NAMESPACE_RETENTION_SECONDS, para que consultas com
+        o alias antigo em cache nunca caiam em um namespace apagado, qualquer
+        que seja o intervalo entre reconstruções.
+        """
+        namespace = f"{alias}-{int(time.time())}"
+        self.upsert(records, namespace)
+
+        # O namespace antigo serve consultas até a troca (e depois pelo cache
+        # de aliases), então a aposentadoria conta a partir do momento da troca
+        swapped_at = int(time.time())
+        current = self.resolve(alias) or {}
+        retired = list(current.get('retired', []))
+        if current.get('namespace'):
+            retired.append(f"{current['namespace']}@{swapped_at}")
+
+        kept = []
+        stale = []
+        for entry in retired:
+            old_namespace, retired_at = entry.rsplit('@', 1)
+            if swapped_at - int(retired_at) >= NAMESPACE_RETENTION_SECONDS:
+                stale.append(old_namespace)
+            else:
+                kept.append(entry)
+
+        self.swap(alias, namespace, retired=kept)
+        for old_namespace in stale:
+            self.index.delete(delete_all=True, namespace=old_namespace)
+        return namespace
+
+    def rebuild_partitioned(self, records: List[Dict], namespace_key) -> Dict[str, str]:
+        """Reconstrói cada namespace lógico retornado por `namespace_key`"""
+        grouped = self._group(records, namespace_key)
+        return {
+            alias: self.rebuild(alias, group)
+            for alias, group in grouped.items()
+        }
+
+    def swap(self, alias: str, namespace: str, retired: Optional[List[str]] = None):
+        """Aponta o alias para o namespace informado (upsert de um único registro)
+
+        `retired` lista os namespaces substituídos ainda não removidos, no
+        formato `<namespace>@<timestamp da substituição>`.
+        """
+        metadata = {'namespace': namespace}
+        if retired:
+            metadata['retired'] = retired
+        self.index.upsert(
+            vectors=[{
+                'id': alias,
+                'values': self._alias_vector(),
+                'metadata': metadata
+            }],
+            namespace=ALIAS_NAMESPACE
+        )
+
+    def _alias_vector(self) -> List[float]:
+        """Vetor placeholder (o Pinecone não aceita vetores só com zeros)"""
+        if self._dimension is None:
+            self._dimension = self.index.describe_index_stats()['dimension']
+        return [1.0] + [0.0] * (self._dimension - 1)
+
+    @staticmethod
+    def _group(records: List[Dict], namespace_key) -> Dict[str, List[Dict]]:
+        grouped = {}
+        for record in records:
+            grouped.setdefault(namespace_key(record), []).append(record)
+        return grouped
@@ -3,15 +3,16 @@ from typing import List
 import json
 
 import pinecone
-from langchain_community.vectorstores import Pinecone
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from dotenv import load_dotenv
 
+from index_writer import IndexWriter, TEXT_KEY, namespace_for
+
 load_dotenv()
 
 class PineconeIngestor:
-    def __init__(self):
+    def __init__(self, batch_size: int = 100, max_workers: int = 4):
         # Configurar conexão com OpenAI
         self.embeddings = OpenAIEmbeddings(
             model="text-embedding-ada-002",
@@ -31,6 +32,8 @@ class PineconeIngestor:
         # Verificar se o índice existe
         if self.index_name not in self.pc.list_indexes().names():
             raise ValueError(f"Índice {self.index_name} não encontrado!")
+        
+        self.writer = IndexWriter(self.index, batch_size=batch_size, max_workers=max_workers)
 
     def load_processed_documents(self, file_path: str) -> List[Document]:
         """Carrega documentos pré-processados de arquivo"""
@@ -46,14 +49,24 @@ class PineconeIngestor:
         ]
     
     def ingest_documents(self, documents: List[Document]):
-        """Realiza a ingestão dos documentos no Pinecone"""
-        print(self.index_name)
-        Pinecone.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            index_name=self.index_name,  # Parâmetro corrigido
-            # pinecone_client=self.pc  # Passar o cliente explicitamente
+        """Realiza a ingestão dos documentos no Pinecone, um namespace por tipo de entidade"""
+        embeddings = self.embeddings.embed_documents(
+            [doc.page_content for doc in documents]
+        )
+        records = [
+            {
+                "id": f"{doc.metadata['entity_type']}_{doc.metadata['swapi_id']}",
+                "values": emb,
+                "metadata": {**doc.metadata, TEXT_KEY: doc.page_content}
+            }
+            for doc, emb in zip(documents, embeddings)
+        ]
+        namespaces = self.writer.rebuild_partitioned(
+            records,
+            lambda record: namespace_for("swapi", record["metadata"]["entity_type"])
         )
+        for alias, namespace in namespaces.items():
+            print(f"Alias {alias} aponta para {namespace}")
         print(f"{len(documents)} documentos ingeridos no índice {self.index_name}")
 
 if __name__ == "__main__":
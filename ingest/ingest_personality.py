@@ -9,11 +9,16 @@ import time
 import tiktoken
 from unidecode import unidecode  # importa a função para normalizar
 
+from index_writer import IndexWriter, TEXT_KEY, namespace_for
+
 
 # ================= CONFIGURAÇÃO =================
 INDEX_NAME = "sw-index"  
 MAX_TOKENS = 500  
 REQUEST_SLEEP = 1  # segundos para evitar rate limiting
+UPSERT_BATCH_SIZE = 100
+UPSERT_WORKERS = 4
+NAMESPACE = namespace_for("personality", "people")
 
 openai.api_key = os.environ.get("OPENAI_API_KEY")
 
@@ -22,6 +27,7 @@ pc = pinecone.Pinecone(
     environment=os.environ.get("PINECONE_ENV")
 )
 index = pc.Index(INDEX_NAME)
+writer = IndexWriter(index, batch_size=UPSERT_BATCH_SIZE, max_workers=UPSERT_WORKERS)
 # =================================================
 
 def clean_references(text):
@@ -120,18 +126,15 @@ def ingest_personality_data():
                 "character": name,
                 "section": "Personality and traits",
                 "chunk_index": i,
-                "text": chunk
+                TEXT_KEY: chunk
             }
             record = {"id": record_id, "values": emb, "metadata": metadata}
             all_records.append(record)
             time.sleep(REQUEST_SLEEP)
-    # Upsert em batches (exemplo: 100 por batch)
+    # Upsert concorrente em namespace versionado, trocando o alias ao final
     if all_records:
-        batch_size = 100
-        for i in range(0, len(all_records), batch_size):
-            batch = all_records[i:i+batch_size]
-            index.upsert(vectors=batch)
-        print("Dados de personality e traits inseridos com sucesso.")
+        namespace = writer.rebuild(NAMESPACE, all_records)
+        print(f"Dados de personality e traits inseridos com sucesso em {namespace}.")
     else:
         print("Nenhum registro para inserir.")
 
@@ -50,6 +50,59 @@ class SWAPIPreprocessor:
                 processed[key] = value
         return processed
 
+    def build_relationship_graph(self) -> Dict:
+        """Monta o grafo de relacionamentos entre entidades em formato CSR
+
+        Cada nó é uma entidade da SWAPI e cada aresta liga a entidade a outra
+        referenciada por URL (ex: homeworld, pilots, films). As arestas de um
+        nó ficam contíguas em `targets`/`edge_relations`, delimitadas por
+        `offsets[i]:offsets[i + 1]`.
+        """
+        node_index = {}
+        names, types = [], []
+        for type_idx, ep in enumerate(self.endpoints):
+            for entity_id, entity in self.entity_cache[ep].items():
+                node_index[(ep, entity_id)] = len(names)
+                names.append(entity['name'])
+                types.append(type_idx)
+
+        relations = []
+        relation_index = {}
+        offsets, targets, edge_relations = [0], [], []
+        for ep in self.endpoints:
+            for entity_id, entity in self.entity_cache[ep].items():
+                edges = set()
+                for key, value in entity['data'].items():
+                    if key == 'url':
+                        continue
+                    urls = value if isinstance(value, list) else [value]
+                    for url in urls:
+                        if not (isinstance(url, str) and url.startswith('https://')):
+                            continue
+                        parts = url.split('/')
+                        target = node_index.get((parts[-3], parts[-2]))
+                        if target is None:
+                            continue
+                        if key not in relation_index:
+                            relation_index[key] = len(relations)
+                            relations.append(key)
+                        edges.add((target, relation_index[key]))
+
+                for target, relation in sorted(edges):
+                    targets.append(target)
+                    edge_relations.append(relation)
+                offsets.append(len(targets))
+
+        return {
+            'entity_types': self.endpoints,
+            'relations': relations,
+            'names': names,
+            'types': types,
+            'offsets': offsets,
+            'targets': targets,
+            'edge_relations': edge_relations
+        }
+
     def generate_documents(self) -> List[Document]:
         """Gera documentos LangChain formatados"""
         documents = []
@@ -92,4 +145,11 @@ if __name__ == "__main__":
     with open("processed_docs.json", "w") as f:
         json.dump(processed_data, f)
     
-    print(f"Documentos salvos em 'processed_docs.json'")
\ No newline at end of file
+    print(f"Documentos salvos em 'processed_docs.json'")
+
+    # Grafo de relacionamentos usado pela Lambda FetchContext
+    graph = processor.build_relationship_graph()
+    with open("relationship_graph.json", "w") as f:
+        json.dump(graph, f, separators=(',', ':'))
+
+    print(f"Grafo de relacionamentos salvo em 'relationship_graph.json'")
\ No newline at end of file
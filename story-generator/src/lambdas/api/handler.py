@@ -3,25 +3,29 @@ import os
 import boto3
 from datetime import datetime
 
+from instrumentation import instrumented, timed, log, get_request_id
+from story_cache import (
+    CACHE_PREFIX, combination_key, should_count, record_request, get_pooled_story,
+    get_story_by_id
+)
+
 def datetime_handler(obj):
     """Serializa objetos datetime para JSON"""
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
+@instrumented('api')
 def lambda_handler(event, context):
     """API Lambda para gerar histórias"""
-    print("Evento recebido:", json.dumps(event))
-    
     # Extrair método e path
     method = event['requestContext']['http']['method']
     path = event['rawPath']
-    print(f"Método: {method}, Path: {path}")
+    log("Requisição recebida", method=method, path=path)
     
     # Remover o stage do path
     if path.startswith('/staging/'):
         path = path[len('/staging/'):]
-    print(f"Path após remover stage: {path}")
     
     if method == 'POST' and path == 'historia':
         return iniciar_geracao(event)
@@ -37,11 +41,9 @@ def lambda_handler(event, context):
 def iniciar_geracao(event):
     """Inicia geração de história"""
     try:
-        print("Iniciando geração de história")
-        
         # Extrair dados do corpo
         body = json.loads(event['body'])
-        print("Corpo da requisição:", json.dumps(body))
+        log("Corpo da requisição", sample=True, body=body)
         
         # Validar campos obrigatórios
         campos = ['personagens', 'planetas', 'naves']
@@ -54,17 +56,31 @@ def iniciar_geracao(event):
                     })
                 }
         
+        # Servir do pool de histórias pré-geradas, se houver
+        with timed('Cache'):
+            cached = buscar_no_cache(body)
+        if cached:
+            log("História servida do cache", pedido_id=cached['pedido_id'])
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'pedido_id': cached['pedido_id'],
+                    'status': 'concluido',
+                    'resultado': cached['resultado']
+                })
+            }
+        
         # Iniciar Step Function
         sfn = boto3.client('stepfunctions')
-        print("ARN da Step Function:", os.environ['STORY_STATE_MACHINE_ARN'])
-        response = sfn.start_execution(
-            stateMachineArn=os.environ['STORY_STATE_MACHINE_ARN'],
-            input=json.dumps(body)
-        )
-        print("Resposta da Step Function:", json.dumps(response, default=datetime_handler))
+        with timed('StartExecution'):
+            response = sfn.start_execution(
+                stateMachineArn=os.environ['STORY_STATE_MACHINE_ARN'],
+                input=json.dumps({**body, 'request_id': get_request_id()})
+            )
         
         # Extrair ID da execução do ARN
         execution_id = response['executionArn'].split(':')[-1]
+        log("Execução iniciada", pedido_id=execution_id)
         
         return {
             'statusCode': 202,
@@ -75,7 +91,7 @@ def iniciar_geracao(event):
         }
         
     except json.JSONDecodeError:
-        print("Erro: JSON inválido")
+        log("Erro: JSON inválido")
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -83,7 +99,7 @@ def iniciar_geracao(event):
             })
         }
     except Exception as e:
-        print(f"Erro inesperado: {str(e)}")
+        log("Erro inesperado", erro=str(e), tipo=type(e).__name__)
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -91,31 +107,56 @@ def iniciar_geracao(event):
             })
         }
 
+def buscar_no_cache(body):
+    """Retorna uma variante pré-gerada e registra (por amostragem) a popularidade"""
+    if not os.environ.get('STORY_CACHE_TABLE'):
+        return None
+    try:
+        key = combination_key(body)
+        cached = get_pooled_story(key)
+        # Só uma fração das requisições paga a contagem, com peso proporcional
+        if should_count():
+            estimativa = record_request(key, body)
+            log("Popularidade da combinação", sample=True, chave=key, estimativa=estimativa)
+        return cached
+    except Exception as e:
+        # Falha no cache nunca impede a geração normal
+        log("Erro ao consultar cache", erro=str(e))
+        return None
+
 def verificar_status(pedido_id):
     """Verifica status de uma geração"""
     try:
-        print(f"Verificando status do pedido: {pedido_id}")
+        log("Verificando status", pedido_id=pedido_id)
+        
+        # Histórias servidas do pool pré-gerado não têm execução
+        if pedido_id.startswith(CACHE_PREFIX):
+            result = get_story_by_id(pedido_id)
+            return {
+                'statusCode': 200 if result else 404,
+                'body': json.dumps({
+                    'pedido_id': pedido_id,
+                    'status': 'concluido' if result else 'desconhecido',
+                    'resultado': result
+                })
+            }
         
         # Buscar execução da Step Function
         sfn = boto3.client('stepfunctions')
-        print("Cliente Step Functions criado")
         
         # Construir ARN da execução
         state_machine_arn = os.environ['STORY_STATE_MACHINE_ARN']
-        print(f"ARN da state machine: {state_machine_arn}")
         
         state_machine_name = state_machine_arn.split(':')[-1]  # StoryStateMachine-N4PwDu9nLLld
         execution_arn = state_machine_arn.replace(
             f':stateMachine:{state_machine_name}',
             f':execution:{state_machine_name}:{pedido_id}'
         )
-        print(f"ARN da execução: {execution_arn}")
         
-        print("Chamando describe_execution...")
-        response = sfn.describe_execution(
-            executionArn=execution_arn
-        )
-        print("Resposta da Step Function:", json.dumps(response, default=datetime_handler))
+        with timed('DescribeExecution'):
+            response = sfn.describe_execution(
+                executionArn=execution_arn
+            )
         
         # Mapear status
         status_map = {
@@ -125,17 +166,13 @@ def verificar_status(pedido_id):
             'TIMED_OUT': 'timeout',
             'ABORTED': 'cancelado'
         }
-        print(f"Status original: {response['status']}")
-        
         status = status_map.get(response['status'], 'desconhecido')
-        print(f"Status mapeado: {status}")
+        log("Status da execução", pedido_id=pedido_id, status_original=response['status'], status=status)
         
         # Se concluído com sucesso, incluir resultado
         result = None
         if status == 'concluido':
-            print("Processando resultado...")
             result = json.loads(response['output'])
-            print(f"Resultado: {json.dumps(result)}")
         
         resposta = {
             'statusCode': 200,
@@ -145,13 +182,10 @@ def verificar_status(pedido_id):
                 'resultado': result
             }, default=datetime_handler)
         }
-        print(f"Resposta final: {json.dumps(resposta)}")
         return resposta
         
     except Exception as e:
-        print(f"Erro ao verificar status: {str(e)}")
-        print(f"Tipo do erro: {type(e)}")
-        print(f"Args do erro: {e.args}")
+        log("Erro ao verificar status", erro=str(e), tipo=type(e).__name__)
         return {
             'statusCode': 500,
             'body': json.dumps({
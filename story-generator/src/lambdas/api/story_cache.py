@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Count-min sketch: SKETCH_DEPTH linhas x SKETCH_WIDTH colunas por janela diária
+SKETCH_DEPTH = int(os.environ.get('SKETCH_DEPTH', '4'))
+SKETCH_WIDTH = int(os.environ.get('SKETCH_WIDTH', '2048'))
+# Só 1 em COUNT_SAMPLE_EVERY requisições é contada, com peso COUNT_SAMPLE_EVERY
+COUNT_SAMPLE_EVERY = int(os.environ.get('COUNT_SAMPLE_EVERY', '10'))
+# Estimativa a partir da qual a combinação vira candidata à pré-geração
+CANDIDATE_THRESHOLD = int(os.environ.get('CANDIDATE_THRESHOLD', '50'))
+# Contadores e candidatos expiram depois de duas janelas
+WINDOW_TTL_SECONDS = 2 * 24 * 3600
+
+CACHE_PREFIX = 'cache-'
+
+_table = None
+_client = None
+_executor = ThreadPoolExecutor(max_workers=SKETCH_DEPTH)
+
+
+def get_table():
+    """Retorna a tabela DynamoDB do cache (reutilizada entre invocações)"""
+    global _table
+    if _table is None:
+        _table = boto3.resource('dynamodb').Table(os.environ['STORY_CACHE_TABLE'])
+    return _table
+
+
+def get_client():
+    """Cliente DynamoDB de baixo nível (thread-safe, usado nas escritas paralelas)"""
+    global _client
+    if _client is None:
+        _client = boto3.client('dynamodb')
+    return _client
+
+
+def current_window() -> str:
+    """Janela de contagem atual (um dia, em UTC)"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def combination_key(body: Dict[str, Any]) -> str:
+    """Chave estável da combinação de entidades, independente de ordem e caixa"""
+    normalized = {
+        campo: sorted(' '.join(str(v).lower().split()) for v in body[campo])
+        for campo in ('personagens', 'planetas', 'naves')
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def should_count() -> bool:
+    """Amostragem das requisições contadas no sketch"""
+    return random.randrange(COUNT_SAMPLE_EVERY) == 0
+
+
+def _increment_cell(window: str, row: int, key: str, expira_em: int) -> int:
+    """Incrementa a célula da linha `row` com o peso da amostragem"""
+    digest = hashlib.md5(f"{row}:{key}".encode('utf-8')).hexdigest()
+    column = int(digest, 16) % SKETCH_WIDTH
+    response = get_client().update_item(
+        TableName=os.environ['STORY_CACHE_TABLE'],
+        # Uma partição por linha, para não concentrar as escritas em uma chave
+        Key={'pk': {'S': f"sketch#{window}#{row}"}, 'sk': {'S': str(column)}},
+        UpdateExpression='ADD contagem :peso SET expira_em = :expira',
+        ExpressionAttributeValues={
+            ':peso': {'N': str(COUNT_SAMPLE_EVERY)},
+            ':expira': {'N': str(expira_em)}
+        },
+        ReturnValues='UPDATED_NEW'
+    )
+    return int(response['Attributes']['contagem']['N'])
+
+
+def record_request(key: str, body: Dict[str, Any]) -> int:
+    """Conta a requisição no count-min sketch e retorna a estimativa de popularidade
+
+    Cada célula do sketch é um item pequeno atualizado com ADD atômico, então
+    a memória é limitada a SKETCH_DEPTH * SKETCH_WIDTH itens por janela,
+    qualquer que seja o número de combinações distintas. As linhas são
+    atualizadas em paralelo e só as requisições amostradas (should_count)
+    devem chegar aqui.
+    """
+    table = get_table()
+    window = current_window()
+    expira_em = int(time.time()) + WINDOW_TTL_SECONDS
+
+    estimate = min(_executor.map(
+        lambda row: _increment_cell(window, row, key, expira_em),
+        range(SKETCH_DEPTH)
+    ))
+
+    # A estimativa pode saltar (amostragem, colisões, concorrência), então a
+    # candidata é gravada sempre que a estimativa supera a registrada
+    if estimate >= CANDIDATE_THRESHOLD:
+        try:
+            table.put_item(
+                Item={
+                    'pk': f"candidatos#{window}",
+                    'sk': key,
+                    'estimativa': estimate,
+                    'pedido': {campo: body[campo] for campo in ('personagens', 'planetas', 'naves')},
+                    'expira_em': expira_em
+                },
+                ConditionExpression='attribute_not_exists(sk) OR estimativa < :estimativa',
+                ExpressionAttributeValues={':estimativa': estimate}
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+    return estimate
+
+
+def get_pooled_story(key: str) -> Optional[Dict[str, Any]]:
+    """Sorteia uma das variantes pré-geradas da combinação, se houver"""
+    response = get_table().query(
+        KeyConditionExpression=Key('pk').eq(f"pool#{key}")
+    )
+    now = int(time.time())
+    # O TTL do DynamoDB não remove itens imediatamente
+    variants = [item for item in response['Items'] if int(item['expira_em']) > now]
+    if not variants:
+        return None
+    item = random.choice(variants)
+    return {
+        'pedido_id': f"{CACHE_PREFIX}{key}-{item['sk']}",
+        'resultado': {'historia': item['historia']}
+    }
+
+
+def get_story_by_id(pedido_id: str) -> Optional[Dict[str, Any]]:
+    """Busca uma variante pelo pedido_id retornado por get_pooled_story"""
+    key, _, variant = pedido_id[len(CACHE_PREFIX):].partition('-')
+    if not key or not variant:
+        return None
+    response = get_table().get_item(Key={'pk': f"pool#{key}", 'sk': variant})
+    item = response.get('Item')
+    if item is None:
+        return None
+    return {'historia': item['historia']}
@@ -2,3 +2,11 @@
 
 # Install dependencies
 pip install -r requirements.txt -t .
+
+# Copiar o grafo de relacionamentos gerado por ingest/swapi_preprocessor.py
+GRAPH_FILE="$(dirname "$0")/../../../../ingest/relationship_graph.json"
+if [ -f "$GRAPH_FILE" ]; then
+    cp "$GRAPH_FILE" "$(dirname "$0")/relationship_graph.json"
+else
+    echo "Aviso: $GRAPH_FILE não encontrado; execute ingest/swapi_preprocessor.py" >&2
+fi
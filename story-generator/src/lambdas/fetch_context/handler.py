@@ -1,11 +1,16 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
 import boto3
 from pinecone import Pinecone
 from langchain.embeddings import BedrockEmbeddings
 
+from instrumentation import instrumented, timed, log
+from namespaces import TEXT_KEY, resolve_namespaces
+from relationship_graph import get_relationship_graph
+
 
 def get_pinecone_secrets():
     """Busca credenciais do Pinecone diretamente do Secrets Manager"""
@@ -13,7 +18,8 @@ def get_pinecone_secrets():
     secret_name = "myproject/starwars"
     
     try:
-        response = secrets.get_secret_value(SecretId=secret_name)
+        with timed('SecretsManager'):
+            response = secrets.get_secret_value(SecretId=secret_name)
         return json.loads(response['SecretString'])
     except Exception as e:
         raise RuntimeError(f"Erro ao buscar segredo: {str(e)}")
@@ -24,24 +30,35 @@ def get_embeddings(text: str, bedrock) -> List[float]:
         model_id="cohere.embed-multilingual",
         client=bedrock
     )
-    return embeddings.embed_query(text)
+    with timed('Embedding'):
+        return embeddings.embed_query(text)
 
-def fetch_entity_context(entity: str, index, bedrock, top_k: int = 2) -> List[str]:
-    """Busca contexto para uma entidade específica"""
+def fetch_entity_context(entity: str, index, bedrock, namespaces: List[str], top_k: int = 2) -> List[str]:
+    """Busca contexto para uma entidade específica nos namespaces informados"""
     query_embedding = get_embeddings(entity, bedrock)
     
-    # Buscar vetores mais similares
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True
-    )
+    def query_namespace(namespace: str):
+        with timed('VectorQuery'):
+            return index.query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True,
+                namespace=namespace
+            )
+    
+    # Buscar vetores mais similares em todos os namespaces em paralelo
+    with ThreadPoolExecutor(max_workers=len(namespaces)) as executor:
+        matches = [
+            match
+            for results in executor.map(query_namespace, namespaces)
+            for match in results['matches']
+        ]
     
     # Extrair e retornar o contexto
     contexts = []
-    for match in results['matches']:
+    for match in sorted(matches, key=lambda m: m['score'], reverse=True)[:top_k]:
         if match['score'] >= 0.7:  # Threshold de similaridade
-            contexts.append(match['metadata']['context'])
+            contexts.append(match['metadata'][TEXT_KEY])
     
     return contexts
 
@@ -64,18 +81,31 @@ def fetch_context(characters: List[str], planets: List[str], ships: List[str]) -
     
     # Processar personagens
     for character in characters:
-        context['characters'][character] = fetch_entity_context(character, index, bedrock)
+        context['characters'][character] = fetch_entity_context(
+            character, index, bedrock, resolve_namespaces(index, 'characters')
+        )
     
     # Processar planetas
     for planet in planets:
-        context['planets'][planet] = fetch_entity_context(planet, index, bedrock)
+        context['planets'][planet] = fetch_entity_context(
+            planet, index, bedrock, resolve_namespaces(index, 'planets')
+        )
     
     # Processar naves
     for ship in ships:
-        context['ships'][ship] = fetch_entity_context(ship, index, bedrock)
+        context['ships'][ship] = fetch_entity_context(
+            ship, index, bedrock, resolve_namespaces(index, 'ships')
+        )
+    
+    # Relacionamentos entre as entidades a partir do grafo pré-computado
+    graph = get_relationship_graph()
+    if graph is not None:
+        with timed('RelationshipGraph'):
+            context['relations'] = graph.relations_between(characters + planets + ships)
     
     return context
 
+@instrumented('fetch_context')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Handler do Lambda"""
     try:
@@ -93,6 +123,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        log("Erro ao buscar contexto", erro=str(e), tipo=type(e).__name__)
         return {
             'statusCode': 500,
             'body': {'error': str(e)}
@@ -0,0 +1,48 @@
+import time
+from typing import List, Dict
+
+# Deve ser o mesmo namespace de aliases usado pelo IndexWriter da ingestão
+ALIAS_NAMESPACE = "aliases"
+# Chave de metadata com o texto do chunk, a mesma gravada pela ingestão
+TEXT_KEY = "text"
+# Deve ser menor que NAMESPACE_RETENTION_SECONDS do IndexWriter, que mantém
+# os namespaces substituídos até os caches expirarem
+ALIAS_TTL_SECONDS = 300
+
+# Namespaces lógicos consultados para cada tipo de entidade da requisição.
+# Todos os namespaces gravados por ingest_data.py aparecem em algum tipo:
+# espécies com personagens e filmes em todos (citam as três entidades)
+ENTITY_NAMESPACES = {
+    'characters': ['swapi-people', 'personality-people', 'swapi-species', 'swapi-films'],
+    'planets': ['swapi-planets', 'swapi-films'],
+    'ships': ['swapi-starships', 'swapi-vehicles', 'swapi-films']
+}
+
+_aliases: Dict[str, str] = {}
+_expires_at = 0.0
+
+
+def resolve_namespaces(index, entity_type: str) -> List[str]:
+    """Resolve os namespaces ativos de um tipo de entidade
+
+    Os aliases são buscados todos de uma vez e mantidos em cache no container
+    por ALIAS_TTL_SECONDS. Cada alias ainda não criado (índice no layout
+    antigo ou migração parcial) é substituído pelo namespace padrão, que é
+    consultado uma única vez.
+    """
+    global _aliases, _expires_at
+    if time.time() >= _expires_at:
+        ids = list(dict.fromkeys(
+            alias for aliases in ENTITY_NAMESPACES.values() for alias in aliases
+        ))
+        response = index.fetch(ids=ids, namespace=ALIAS_NAMESPACE)
+        _aliases = {
+            alias: vector['metadata']['namespace']
+            for alias, vector in response['vectors'].items()
+        }
+        _expires_at = time.time() + ALIAS_TTL_SECONDS
+
+    return list(dict.fromkeys(
+        _aliases.get(alias, '')
+        for alias in ENTITY_NAMESPACES[entity_type]
+    ))
@@ -0,0 +1,112 @@
+import json
+import os
+from array import array
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple
+
+from instrumentation import log
+
+GRAPH_PATH = os.environ.get(
+    'RELATIONSHIP_GRAPH_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relationship_graph.json')
+)
+
+
+def normalize_name(name: str) -> str:
+    """Normaliza nomes para busca sem diferenciar maiúsculas e espaços"""
+    return ' '.join(name.lower().split())
+
+
+class RelationshipGraph:
+    """Grafo de relacionamentos da SWAPI em formato CSR, gerado na ingestão"""
+
+    def __init__(self, data: Dict):
+        self.entity_types = data['entity_types']
+        self.relations = data['relations']
+        self.names = data['names']
+        self.types = array('B', data['types'])
+        self.offsets = array('I', data['offsets'])
+        self.targets = array('I', data['targets'])
+        self.edge_relations = array('H', data['edge_relations'])
+
+        self.name_index = defaultdict(list)
+        for node, name in enumerate(self.names):
+            if name:
+                self.name_index[normalize_name(name)].append(node)
+
+    @classmethod
+    def load(cls, path: str = GRAPH_PATH) -> 'RelationshipGraph':
+        """Carrega o grafo do arquivo JSON gerado pelo SWAPIPreprocessor"""
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def find_nodes(self, name: str) -> List[int]:
+        """Retorna os nós cujo nome corresponde ao nome informado"""
+        return self.name_index.get(normalize_name(name), [])
+
+    def neighbors(self, node: int) -> List[Tuple[str, int]]:
+        """Retorna pares (relação, nó vizinho) de um nó"""
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return [
+            (self.relations[self.edge_relations[i]], self.targets[i])
+            for i in range(start, end)
+        ]
+
+    def relations_between(self, entities: List[str]) -> Dict[str, List[str]]:
+        """Descreve como as entidades solicitadas se relacionam
+
+        Percorre uma única vez as arestas de cada entidade e retorna:
+        - direct: relações diretas entre duas entidades solicitadas
+        - shared: entidades não solicitadas ligadas a duas ou mais solicitadas
+        """
+        requested = {}
+        for entity in entities:
+            for node in self.find_nodes(entity):
+                requested[node] = entity
+
+        direct = []
+        # A SWAPI costuma ter a aresta nos dois sentidos (homeworld/residents),
+        # então cada par de entidades gera uma única relação direta
+        seen_pairs = set()
+        shared = defaultdict(set)
+        for node in requested:
+            for relation, target in self.neighbors(node):
+                if target in requested and target != node:
+                    pair = frozenset((node, target))
+                    if pair not in seen_pairs:
+                        seen_pairs.add(pair)
+                        direct.append(
+                            f"{self.names[node]} -> {relation}: {self.names[target]}"
+                        )
+                elif target not in requested:
+                    shared[target].add(node)
+
+        shared_facts = []
+        for target, nodes in shared.items():
+            if len(nodes) < 2:
+                continue
+            linked = ', '.join(sorted(self.names[n] for n in nodes))
+            target_type = self.entity_types[self.types[target]]
+            shared_facts.append(f"{linked} -> {target_type}: {self.names[target]}")
+
+        return {
+            'direct': direct,
+            'shared': sorted(shared_facts)
+        }
+
+
+_graph = None
+_missing_logged = False
+
+
+def get_relationship_graph() -> Optional[RelationshipGraph]:
+    """Carrega o grafo uma única vez por container (None se não houver arquivo)"""
+    global _graph, _missing_logged
+    if _graph is None:
+        if os.path.exists(GRAPH_PATH):
+            _graph = RelationshipGraph.load(GRAPH_PATH)
+        elif not _missing_logged:
+            log("Aviso: grafo de relacionamentos não encontrado, relações desativadas",
+                path=GRAPH_PATH)
+            _missing_logged = True
+    return _graph
@@ -1,7 +1,10 @@
 import json
 import boto3
 
+from instrumentation import instrumented, timed, log, put_metric
 
+
+@instrumented('generate_story')
 def lambda_handler(event, context):
     """Gera história usando Bedrock"""
     
@@ -9,10 +12,49 @@ def lambda_handler(event, context):
     personagens = event['personagens']
     planetas = event['planetas']
     naves = event['naves']
-    contexto = event['contexto']  # vem do FetchContext
+    contexto = event['contexto']['body']  # retorno da FetchContext ({statusCode, body})
     
     # Montar prompt
-    prompt = f"""Você é um narrador de histórias de Star Wars. Use o contexto fornecido para criar uma história envolvente.
+    with timed('PromptBuild'):
+        prompt = build_prompt(personagens, planetas, naves, contexto)
+    put_metric('PromptChars', len(prompt))
+
+    # Chamar Bedrock
+    bedrock = boto3.client('bedrock-runtime')
+    
+    with timed('BedrockInvoke'):
+        response = bedrock.invoke_model(
+            modelId='anthropic.claude-v2',
+            body=json.dumps({
+                "prompt": f"\n\nHuman: {prompt}\n\nAssistant: ",
+                "max_tokens_to_sample": 1000,
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "anthropic_version": "bedrock-2023-05-31"
+            })
+        )
+    
+    # Contagem de tokens informada pelo Bedrock nos headers da resposta
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    for header, metric in (
+        ('x-amzn-bedrock-input-token-count', 'InputTokens'),
+        ('x-amzn-bedrock-output-token-count', 'OutputTokens')
+    ):
+        if header in headers:
+            put_metric(metric, int(headers[header]))
+    
+    # Extrair história
+    historia = json.loads(response['body'].read())['completion']
+    log("História gerada", caracteres=len(historia))
+    
+    return {
+        'historia': historia.strip()
+    }
+
+
+def build_prompt(personagens, planetas, naves, contexto):
+    """Monta o prompt de geração a partir das entidades e do contexto"""
+    return f"""Você é um narrador de histórias de Star Wars. Use o contexto fornecido para criar uma história envolvente.
 
 Contexto sobre os elementos:
 {contexto}
@@ -30,24 +72,3 @@ Crie uma história emocionante em português que:
 5. Termine com uma conclusão satisfatória
 
 História:"""
-
-    # Chamar Bedrock
-    bedrock = boto3.client('bedrock-runtime')
-    
-    response = bedrock.invoke_model(
-        modelId='anthropic.claude-v2',
-        body=json.dumps({
-            "prompt": f"\n\nHuman: {prompt}\n\nAssistant: ",
-            "max_tokens_to_sample": 1000,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "anthropic_version": "bedrock-2023-05-31"
-        })
-    )
-    
-    # Extrair história
-    historia = json.loads(response['body'].read())['completion']
-    
-    return {
-        'historia': historia.strip()
-    }
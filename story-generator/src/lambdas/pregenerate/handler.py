@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+
+from instrumentation import instrumented, timed, log, put_metric, get_request_id
+
+TOP_COMBINACOES = int(os.environ.get('TOP_COMBINACOES', '20'))
+VARIANTES = int(os.environ.get('VARIANTES', '3'))
+# Variantes ficam válidas por duas execuções agendadas
+POOL_TTL_SECONDS = int(os.environ.get('POOL_TTL_SECONDS', str(2 * 3600)))
+# Combinações processadas em paralelo (cada uma gera VARIANTES em paralelo)
+PARALELISMO = int(os.environ.get('PARALELISMO', '5'))
+# Não inicia novas combinações com menos tempo restante que isso
+# (FetchContext + GenerateStory, 30 s de timeout cada, com folga)
+MARGEM_MS = int(os.environ.get('MARGEM_MS', '90000'))
+
+
+def buscar_candidatas(table) -> List[Dict[str, Any]]:
+    """Retorna as combinações mais populares das janelas de hoje e de ontem"""
+    hoje = datetime.now(timezone.utc)
+    candidatas = {}
+    for dia in (hoje, hoje - timedelta(days=1)):
+        window = dia.strftime('%Y-%m-%d')
+        response = table.query(
+            KeyConditionExpression=Key('pk').eq(f"candidatos#{window}")
+        )
+        for item in response['Items']:
+            atual = candidatas.get(item['sk'])
+            if atual is None or item['estimativa'] > atual['estimativa']:
+                candidatas[item['sk']] = item
+
+    ordenadas = sorted(candidatas.values(), key=lambda c: c['estimativa'], reverse=True)
+    return ordenadas[:TOP_COMBINACOES]
+
+
+def invocar(lambda_client, function_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Invoca uma Lambda de forma síncrona e retorna o payload de resposta"""
+    response = lambda_client.invoke(
+        FunctionName=function_name,
+        Payload=json.dumps(payload)
+    )
+    result = json.loads(response['Payload'].read())
+    if 'FunctionError' in response:
+        raise RuntimeError(f"Erro em {function_name}: {result}")
+    return result
+
+
+def gerar_variantes(lambda_client, pedido: Dict[str, Any]) -> List[str]:
+    """Busca o contexto uma vez e gera VARIANTES histórias em paralelo para a combinação"""
+    pedido = {**pedido, 'request_id': get_request_id()}
+    resposta = invocar(lambda_client, os.environ['FETCH_CONTEXT_FUNCTION'], pedido)
+    # A FetchContext trata os próprios erros e responde com statusCode 500
+    if resposta.get('statusCode') != 200:
+        raise RuntimeError(f"FetchContext retornou {resposta.get('statusCode')}: {resposta.get('body')}")
+
+    # Mesmo `contexto` do fluxo da Step Function (ResultSelector de BuscarContexto)
+    def gerar(_):
+        return invocar(
+            lambda_client,
+            os.environ['GENERATE_STORY_FUNCTION'],
+            {**pedido, 'contexto': resposta}
+        )['historia']
+
+    with ThreadPoolExecutor(max_workers=VARIANTES) as executor:
+        return list(executor.map(gerar, range(VARIANTES)))
+
+
+def pre_gerar(lambda_client, candidata: Dict[str, Any], context) -> Optional[List[str]]:
+    """Gera as variantes de uma combinação, se ainda houver tempo na execução"""
+    if context.get_remaining_time_in_millis() < MARGEM_MS:
+        log("Tempo insuficiente, combinação ignorada", chave=candidata['sk'])
+        return None
+    try:
+        with timed('Pregeneration'):
+            return gerar_variantes(lambda_client, candidata['pedido'])
+    except Exception as e:
+        log("Erro ao pré-gerar", chave=candidata['sk'], erro=str(e))
+        return None
+
+
+@instrumented('pregenerate')
+def lambda_handler(event, context):
+    """Pré-gera histórias para as combinações mais populares (execução agendada)"""
+    table = boto3.resource('dynamodb').Table(os.environ['STORY_CACHE_TABLE'])
+    lambda_client = boto3.client('lambda', config=Config(
+        max_pool_connections=PARALELISMO * VARIANTES,
+        read_timeout=60
+    ))
+
+    candidatas = buscar_candidatas(table)
+    log("Pré-gerando histórias", variantes=VARIANTES, combinacoes=len(candidatas))
+
+    # As combinações rodam em paralelo; as menos populares são as que ficam
+    # de fora se o tempo acabar
+    with ThreadPoolExecutor(max_workers=PARALELISMO) as executor:
+        resultados = list(executor.map(
+            lambda candidata: pre_gerar(lambda_client, candidata, context),
+            candidatas
+        ))
+
+    geracao = int(time.time())
+    expira_em = geracao + POOL_TTL_SECONDS
+    geradas = 0
+    with table.batch_writer() as batch:
+        for candidata, historias in zip(candidatas, resultados):
+            if not historias:
+                continue
+            for i, historia in enumerate(historias):
+                batch.put_item(Item={
+                    'pk': f"pool#{candidata['sk']}",
+                    'sk': f"{geracao}_{i:02d}",
+                    'historia': historia,
+                    'expira_em': expira_em
+                })
+            geradas += len(historias)
+
+    put_metric('PregeneratedStories', geradas)
+    return {
+        'combinacoes': len(candidatas),
+        'historias': geradas
+    }
@@ -0,0 +1,148 @@
+import functools
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'StoryGenerator')
+# Fração das invocações cujos logs detalhados (sample=True) são emitidos
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.1'))
+
+
+class StdoutCollector:
+    """Envia cada documento para o stdout (CloudWatch Logs interpreta o EMF)"""
+
+    def emit(self, record: Dict[str, Any]):
+        sys.stdout.write(json.dumps(record, default=str) + '\n')
+
+
+class LocalCollector:
+    """Guarda os documentos em memória, para testes e execução local"""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def emit(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        return [r for r in self.records if '_aws' in r]
+
+    def logs(self) -> List[Dict[str, Any]]:
+        return [r for r in self.records if '_aws' not in r]
+
+
+class _Invocation:
+    """Estado de uma invocação: request id, amostragem e métricas acumuladas"""
+
+    def __init__(self, function: str, request_id: str):
+        self.function = function
+        self.request_id = request_id
+        self.sampled = random.random() < LOG_SAMPLE_RATE
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+
+
+_collector = StdoutCollector()
+_invocation: Optional[_Invocation] = None
+
+
+def set_collector(collector):
+    """Troca o destino dos logs e métricas (ex: LocalCollector em testes)"""
+    global _collector
+    _collector = collector
+
+
+def get_request_id() -> Optional[str]:
+    """Request id da invocação atual, para propagar aos próximos estágios"""
+    return _invocation.request_id if _invocation else None
+
+
+def start_invocation(function: str, request_id: Optional[str] = None):
+    """Inicia o escopo de uma invocação (gera um request id se não houver)"""
+    global _invocation
+    _invocation = _Invocation(function, request_id or str(uuid.uuid4()))
+
+
+def log(message: str, sample: bool = False, **fields):
+    """Log estruturado em JSON; com sample=True só é emitido nas invocações amostradas"""
+    if sample and not (_invocation and _invocation.sampled):
+        return
+    record = {'message': message, **fields}
+    if _invocation:
+        record['function'] = _invocation.function
+        record['request_id'] = _invocation.request_id
+    _collector.emit(record)
+
+
+def put_metric(name: str, value: float, unit: str = 'Count'):
+    """Acumula uma métrica da invocação atual (vários valores viram uma lista)"""
+    if _invocation is None:
+        return
+    metric = _invocation.metrics.setdefault(name, {'unit': unit, 'values': []})
+    metric['values'].append(value)
+
+
+@contextmanager
+def timed(stage: str):
+    """Mede a latência de um estágio e registra como métrica `<stage>Latency`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        put_metric(f"{stage}Latency", (time.perf_counter() - start) * 1000, 'Milliseconds')
+
+
+def flush():
+    """Emite as métricas acumuladas em um único documento CloudWatch EMF"""
+    if _invocation is None or not _invocation.metrics:
+        return
+    metrics = _invocation.metrics
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['function']],
+                'Metrics': [
+                    {'Name': name, 'Unit': metric['unit']}
+                    for name, metric in metrics.items()
+                ]
+            }]
+        },
+        'function': _invocation.function,
+        'request_id': _invocation.request_id
+    }
+    for name, metric in metrics.items():
+        values = metric['values']
+        record[name] = values[0] if len(values) == 1 else values
+    _collector.emit(record)
+    metrics.clear()
+
+
+def instrumented(function: str):
+    """Decorator para lambda_handler: abre o escopo, mede o total e emite as métricas
+
+    O request id vem do campo `request_id` do evento (ou do request id do API
+    Gateway), para que API, FetchContext e GenerateStory compartilhem o mesmo id.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            request_id = None
+            if isinstance(event, dict):
+                request_id = (
+                    event.get('request_id')
+                    or event.get('requestContext', {}).get('requestId')
+                )
+            start_invocation(function, request_id)
+            try:
+                with timed('Handler'):
+                    return handler(event, context)
+            finally:
+                flush()
+        return wrapper
+    return decorator
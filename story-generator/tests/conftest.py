@@ -0,0 +1,14 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# Cada Lambda é empacotada separadamente (e a instrumentação como layer);
+# nos testes os módulos são importados direto das pastas de origem
+for path in (
+    os.path.join(ROOT, 'src', 'layers', 'instrumentation'),
+    os.path.join(ROOT, 'src', 'lambdas', 'fetch_context'),
+    os.path.join(ROOT, 'src', 'lambdas', 'api'),
+    os.path.join(ROOT, '..', 'ingest'),
+):
+    sys.path.insert(0, os.path.abspath(path))
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+import index_writer
+from index_writer import ALIAS_NAMESPACE, NAMESPACE_RETENTION_SECONDS, IndexWriter
+
+
+class FakeIndex:
+    """Índice Pinecone em memória"""
+
+    def __init__(self, fail_on_batch=None):
+        self.namespaces = {}
+        self.upserts = []
+        self.deleted = []
+        self.fail_on_batch = fail_on_batch
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace):
+        with self._lock:
+            if namespace != ALIAS_NAMESPACE:
+                self.upserts.append((namespace, len(vectors)))
+                if self.fail_on_batch is not None and len(self.upserts) == self.fail_on_batch:
+                    raise RuntimeError('falha no upsert')
+            self.namespaces.setdefault(namespace, {}).update({v['id']: v for v in vectors})
+
+    def fetch(self, ids, namespace):
+        stored = self.namespaces.get(namespace, {})
+        return {'vectors': {i: stored[i] for i in ids if i in stored}}
+
+    def delete(self, delete_all, namespace):
+        self.deleted.append(namespace)
+        self.namespaces.pop(namespace, None)
+
+    def describe_index_stats(self):
+        return {'dimension': 3}
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_000_000)
+    monkeypatch.setattr(index_writer.time, 'time', clock)
+    return clock
+
+
+def records(n):
+    return [{'id': str(i), 'values': [1.0, 0.0, 0.0], 'metadata': {}} for i in range(n)]
+
+
+def test_upsert_em_lotes_de_batch_size():
+    index = FakeIndex()
+    writer = IndexWriter(index, batch_size=100, max_workers=3)
+
+    assert writer.upsert(records(250), 'ns') == 250
+    assert sorted(size for _, size in index.upserts) == [50, 100, 100]
+    assert len(index.namespaces['ns']) == 250
+
+
+def test_alias_so_troca_depois_de_todos_os_lotes(clock):
+    index = FakeIndex()
+    writer = IndexWriter(index, batch_size=10)
+    first = writer.rebuild('swapi-people', records(30))
+
+    clock.now += 60
+    failing = FakeIndex(fail_on_batch=2)
+    failing.namespaces = index.namespaces
+    writer = IndexWriter(failing, batch_size=10)
+    with pytest.raises(RuntimeError):
+        writer.rebuild('swapi-people', records(30))
+
+    assert writer.resolve('swapi-people') == {'namespace': first}
+
+
+def test_namespace_aposentado_mantido_dentro_da_retencao(clock):
+    index = FakeIndex()
+    writer = IndexWriter(index, batch_size=10)
+
+    first = writer.rebuild('swapi-people', records(5))
+    clock.now += 60
+    second = writer.rebuild('swapi-people', records(5))
+    clock.now += NAMESPACE_RETENTION_SECONDS - 120
+    third = writer.rebuild('swapi-people', records(5))
+
+    assert index.deleted == []
+    assert {first, second, third} <= set(index.namespaces)
+    assert writer.resolve('swapi-people') == {
+        'namespace': third,
+        'retired': [f"{first}@{1_000_060}", f"{second}@{clock.now}"]
+    }
+
+
+def test_namespace_aposentado_removido_depois_da_retencao(clock):
+    index = FakeIndex()
+    writer = IndexWriter(index, batch_size=10)
+
+    first = writer.rebuild('swapi-people', records(5))
+    clock.now += 60
+    second = writer.rebuild('swapi-people', records(5))
+    clock.now += NAMESPACE_RETENTION_SECONDS
+    third = writer.rebuild('swapi-people', records(5))
+
+    assert index.deleted == [first]
+    assert first not in index.namespaces
+    assert writer.resolve('swapi-people') == {
+        'namespace': third,
+        'retired': [f"{second}@{clock.now}"]
+    }
@@ -0,0 +1,87 @@
+import pytest
+
+import instrumentation
+from instrumentation import LocalCollector
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    collector = LocalCollector()
+    monkeypatch.setattr(instrumentation, '_collector', collector)
+    monkeypatch.setattr(instrumentation, '_invocation', None)
+    return collector
+
+
+def test_emite_um_documento_emf_por_invocacao(collector):
+    @instrumentation.instrumented('fetch_context')
+    def handler(event, context):
+        for _ in range(3):
+            with instrumentation.timed('Embedding'):
+                pass
+        with instrumentation.timed('SecretsManager'):
+            pass
+        instrumentation.put_metric('InputTokens', 42)
+        return 'ok'
+
+    assert handler({'request_id': 'req-1'}, None) == 'ok'
+
+    metrics = collector.metrics()
+    assert len(metrics) == 1
+    record = metrics[0]
+    definition = record['_aws']['CloudWatchMetrics'][0]
+    assert definition['Namespace'] == instrumentation.NAMESPACE
+    assert definition['Dimensions'] == [['function']]
+    names = {m['Name']: m['Unit'] for m in definition['Metrics']}
+    assert names == {
+        'EmbeddingLatency': 'Milliseconds',
+        'SecretsManagerLatency': 'Milliseconds',
+        'InputTokens': 'Count',
+        'HandlerLatency': 'Milliseconds'
+    }
+    assert record['function'] == 'fetch_context'
+    assert record['request_id'] == 'req-1'
+    assert isinstance(record['EmbeddingLatency'], list)
+    assert len(record['EmbeddingLatency']) == 3
+    assert isinstance(record['SecretsManagerLatency'], float)
+    assert record['InputTokens'] == 42
+
+
+def test_request_id_do_api_gateway(collector):
+    @instrumentation.instrumented('api')
+    def handler(event, context):
+        instrumentation.log("Requisição recebida")
+        return instrumentation.get_request_id()
+
+    assert handler({'requestContext': {'requestId': 'apigw-1'}}, None) == 'apigw-1'
+    assert collector.logs()[0]['request_id'] == 'apigw-1'
+    assert collector.metrics()[0]['request_id'] == 'apigw-1'
+
+
+def test_metricas_emitidas_mesmo_com_erro(collector):
+    @instrumentation.instrumented('generate_story')
+    def handler(event, context):
+        with instrumentation.timed('BedrockInvoke'):
+            raise RuntimeError('falhou')
+
+    with pytest.raises(RuntimeError):
+        handler({'request_id': 'req-2'}, None)
+
+    record = collector.metrics()[0]
+    assert 'BedrockInvokeLatency' in record
+    assert 'HandlerLatency' in record
+
+
+@pytest.mark.parametrize('rate, emitido', [(1.0, True), (0.0, False)])
+def test_logs_amostrados(collector, monkeypatch, rate, emitido):
+    monkeypatch.setattr(instrumentation, 'LOG_SAMPLE_RATE', rate)
+
+    @instrumentation.instrumented('api')
+    def handler(event, context):
+        instrumentation.log("Corpo da requisição", sample=True, body={'a': 1})
+        instrumentation.log("Sempre emitido")
+
+    handler({'request_id': 'req-3'}, None)
+
+    messages = [r['message'] for r in collector.logs()]
+    assert ("Corpo da requisição" in messages) is emitido
+    assert "Sempre emitido" in messages
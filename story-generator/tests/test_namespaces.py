@@ -0,0 +1,34 @@
+import pytest
+
+import namespaces
+from namespaces import ALIAS_NAMESPACE
+
+
+class FakeIndex:
+    def __init__(self, aliases):
+        self.aliases = aliases
+
+    def fetch(self, ids, namespace):
+        assert namespace == ALIAS_NAMESPACE
+        return {'vectors': {
+            alias: {'metadata': {'namespace': target}}
+            for alias, target in self.aliases.items()
+            if alias in ids
+        }}
+
+
+@pytest.fixture(autouse=True)
+def sem_cache(monkeypatch):
+    monkeypatch.setattr(namespaces, '_aliases', {})
+    monkeypatch.setattr(namespaces, '_expires_at', 0.0)
+
+
+def test_layout_antigo_consulta_o_namespace_padrao():
+    assert namespaces.resolve_namespaces(FakeIndex({}), 'characters') == ['']
+
+
+def test_migracao_parcial_mantem_o_namespace_padrao():
+    index = FakeIndex({'swapi-people': 'swapi-people-1', 'swapi-films': 'swapi-films-1'})
+
+    assert namespaces.resolve_namespaces(index, 'characters') == ['swapi-people-1', '', 'swapi-films-1']
+    assert namespaces.resolve_namespaces(index, 'planets') == ['', 'swapi-films-1']
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from relationship_graph import RelationshipGraph, normalize_name
+from swapi_preprocessor import SWAPIPreprocessor
+
+
+def url(endpoint, entity_id):
+    return f"https://swapi.dev/api/{endpoint}/{entity_id}/"
+
+
+def entity(name, endpoint, entity_id, **fields):
+    data = {'name': name, 'url': url(endpoint, entity_id), **fields}
+    return {'name': name, 'data': data}
+
+
+@pytest.fixture
+def preprocessor():
+    """SWAPIPreprocessor com um cache pequeno, sem acessar a SWAPI"""
+    processor = SWAPIPreprocessor.__new__(SWAPIPreprocessor)
+    processor.endpoints = ['people', 'planets', 'films', 'species', 'vehicles', 'starships']
+    processor.entity_cache = {ep: {} for ep in processor.endpoints}
+    processor.entity_cache['people'] = {
+        '1': entity('Luke Skywalker', 'people', 1,
+                    homeworld=url('planets', 1),
+                    films=[url('films', 1)],
+                    starships=[url('starships', 12)]),
+        '14': entity('Han Solo', 'people', 14,
+                     homeworld=url('planets', 22),
+                     films=[url('films', 1)],
+                     starships=[url('starships', 10)]),
+    }
+    processor.entity_cache['planets'] = {
+        '1': entity('Tatooine', 'planets', 1, residents=[url('people', 1)]),
+        '22': entity('Corellia', 'planets', 22, residents=[url('people', 14)]),
+    }
+    processor.entity_cache['films'] = {
+        '1': entity('A New Hope', 'films', 1, characters=[url('people', 1), url('people', 14)]),
+    }
+    processor.entity_cache['starships'] = {
+        '10': entity('Millennium Falcon', 'starships', 10, pilots=[url('people', 14)]),
+        '12': entity('X-wing', 'starships', 12, pilots=[url('people', 1)]),
+    }
+    return processor
+
+
+@pytest.fixture
+def graph(preprocessor):
+    # Passa pelo JSON, como no arquivo gerado na ingestão
+    return RelationshipGraph(json.loads(json.dumps(preprocessor.build_relationship_graph())))
+
+
+def test_csr_offsets_delimitam_as_arestas_de_cada_no(preprocessor):
+    data = preprocessor.build_relationship_graph()
+
+    assert len(data['offsets']) == len(data['names']) + 1
+    assert data['offsets'][0] == 0
+    assert data['offsets'][-1] == len(data['targets']) == len(data['edge_relations'])
+
+    luke = data['names'].index('Luke Skywalker')
+    start, end = data['offsets'][luke], data['offsets'][luke + 1]
+    edges = {
+        (data['relations'][data['edge_relations'][i]], data['names'][data['targets'][i]])
+        for i in range(start, end)
+    }
+    assert edges == {
+        ('homeworld', 'Tatooine'),
+        ('films', 'A New Hope'),
+        ('starships', 'X-wing'),
+    }
+    assert data['entity_types'][data['types'][luke]] == 'people'
+
+
+def test_busca_por_nome_normalizado(graph):
+    assert normalize_name('  LUKE   skywalker ') == 'luke skywalker'
+    assert graph.find_nodes('luke  SKYWALKER') == graph.find_nodes('Luke Skywalker')
+    assert len(graph.find_nodes('Luke Skywalker')) == 1
+    assert graph.find_nodes('Jar Jar Binks') == []
+
+
+def test_relacao_direta_uma_vez_por_par(graph):
+    relations = graph.relations_between(['Luke Skywalker', 'Tatooine', 'Han Solo', 'Millennium Falcon'])
+
+    # homeworld/residents e starships/pilots existem nos dois sentidos na SWAPI
+    assert sorted(relations['direct']) == [
+        'Han Solo -> starships: Millennium Falcon',
+        'Luke Skywalker -> homeworld: Tatooine',
+    ]
+
+
+def test_vizinhos_compartilhados(graph):
+    relations = graph.relations_between(['Luke Skywalker', 'Han Solo'])
+
+    assert relations['direct'] == []
+    assert relations['shared'] == ['Han Solo, Luke Skywalker -> films: A New Hope']
+
+
+def test_entidades_desconhecidas_sao_ignoradas(graph):
+    assert graph.relations_between(['Luke Skywalker', 'Jar Jar Binks']) == {
+        'direct': [],
+        'shared': []
+    }
@@ -0,0 +1,153 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import story_cache
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakeClient:
+    """Cliente DynamoDB que devolve a contagem configurada para cada linha do sketch"""
+
+    def __init__(self, counts_by_row):
+        self.counts_by_row = counts_by_row
+        self.updates = []
+
+    def update_item(self, TableName, Key, **kwargs):
+        self.updates.append(Key)
+        row = int(Key['pk']['S'].rsplit('#', 1)[1])
+        return {'Attributes': {'contagem': {'N': str(self.counts_by_row[row])}}}
+
+
+class FakeTable:
+    """Tabela DynamoDB em memória com o subconjunto usado pelo story_cache"""
+
+    def __init__(self, items=()):
+        self.items = {(item['pk'], item['sk']): item for item in items}
+        self.meta = SimpleNamespace(client=SimpleNamespace(exceptions=SimpleNamespace(
+            ConditionalCheckFailedException=ConditionalCheckFailedException
+        )))
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        current = self.items.get((Item['pk'], Item['sk']))
+        if ConditionExpression and current is not None:
+            if current['estimativa'] >= ExpressionAttributeValues[':estimativa']:
+                raise ConditionalCheckFailedException()
+        self.items[(Item['pk'], Item['sk'])] = Item
+
+    def get_item(self, Key):
+        item = self.items.get((Key['pk'], Key['sk']))
+        return {'Item': item} if item else {}
+
+    def query(self, KeyConditionExpression):
+        pk = KeyConditionExpression.get_expression()['values'][1]
+        return {'Items': [item for (item_pk, _), item in self.items.items() if item_pk == pk]}
+
+
+BODY = {'personagens': ['Luke Skywalker'], 'planetas': ['Tatooine'], 'naves': ['X-wing']}
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeTable()
+    monkeypatch.setenv('STORY_CACHE_TABLE', 'cache')
+    monkeypatch.setattr(story_cache, '_table', table)
+    return table
+
+
+def use_client(monkeypatch, counts):
+    client = FakeClient(dict(enumerate(counts)))
+    monkeypatch.setattr(story_cache, '_client', client)
+    return client
+
+
+def candidates(table):
+    return [item for (pk, _), item in table.items.items() if pk.startswith('candidatos#')]
+
+
+def test_combination_key_ignora_ordem_caixa_e_espacos():
+    other = {
+        'personagens': ['  luke   SKYWALKER '],
+        'planetas': ['tatooine'],
+        'naves': ['x-wing']
+    }
+    assert story_cache.combination_key(BODY) == story_cache.combination_key(other)
+
+    two = {**BODY, 'personagens': ['Han Solo', 'Luke Skywalker']}
+    swapped = {**BODY, 'personagens': ['luke skywalker', 'han solo']}
+    assert story_cache.combination_key(two) == story_cache.combination_key(swapped)
+    assert story_cache.combination_key(two) != story_cache.combination_key(BODY)
+
+
+@pytest.mark.parametrize('pedido_id', ['cache-abc', 'cache-', 'cache--01'])
+def test_get_story_by_id_rejeita_ids_malformados(table, pedido_id):
+    assert story_cache.get_story_by_id(pedido_id) is None
+
+
+def test_get_story_by_id(table):
+    table.put_item(Item={'pk': 'pool#abc', 'sk': '100_00', 'historia': 'Era uma vez', 'expira_em': 0})
+    assert story_cache.get_story_by_id('cache-abc-100_00') == {'historia': 'Era uma vez'}
+
+
+def test_record_request_usa_o_minimo_das_linhas(table, monkeypatch):
+    client = use_client(monkeypatch, [80, 60, 95, 70])
+    key = story_cache.combination_key(BODY)
+
+    assert story_cache.record_request(key, BODY) == 60
+    assert len(client.updates) == story_cache.SKETCH_DEPTH
+    # Cada linha fica em uma partição própria
+    assert len({update['pk']['S'] for update in client.updates}) == story_cache.SKETCH_DEPTH
+
+
+def test_record_request_abaixo_do_limite_nao_grava_candidata(table, monkeypatch):
+    below = story_cache.CANDIDATE_THRESHOLD - 1
+    use_client(monkeypatch, [below + 10, below, below + 5, below + 20])
+
+    story_cache.record_request(story_cache.combination_key(BODY), BODY)
+
+    assert candidates(table) == []
+
+
+def test_record_request_grava_candidata_a_partir_do_limite(table, monkeypatch):
+    key = story_cache.combination_key(BODY)
+    threshold = story_cache.CANDIDATE_THRESHOLD
+
+    use_client(monkeypatch, [threshold] * story_cache.SKETCH_DEPTH)
+    story_cache.record_request(key, BODY)
+    assert [c['estimativa'] for c in candidates(table)] == [threshold]
+
+    # Estimativa que salta sem passar por múltiplos do limite também atualiza
+    use_client(monkeypatch, [threshold + 13] * story_cache.SKETCH_DEPTH)
+    story_cache.record_request(key, BODY)
+    (candidate,) = candidates(table)
+    assert candidate['sk'] == key
+    assert candidate['estimativa'] == threshold + 13
+    assert candidate['pedido'] == BODY
+
+    # Estimativa menor (leitura concorrente atrasada) não sobrescreve
+    use_client(monkeypatch, [threshold + 1] * story_cache.SKETCH_DEPTH)
+    story_cache.record_request(key, BODY)
+    assert [c['estimativa'] for c in candidates(table)] == [threshold + 13]
+
+
+def test_get_pooled_story_ignora_itens_expirados(table):
+    now = int(time.time())
+    table.put_item(Item={'pk': 'pool#abc', 'sk': '1_00', 'historia': 'expirada', 'expira_em': now - 10})
+    table.put_item(Item={'pk': 'pool#abc', 'sk': '2_00', 'historia': 'valida', 'expira_em': now + 3600})
+    table.put_item(Item={'pk': 'pool#outra', 'sk': '2_00', 'historia': 'outra', 'expira_em': now + 3600})
+
+    for _ in range(10):
+        assert story_cache.get_pooled_story('abc') == {
+            'pedido_id': 'cache-abc-2_00',
+            'resultado': {'historia': 'valida'}
+        }
+
+
+def test_get_pooled_story_sem_variantes_validas(table):
+    table.put_item(Item={'pk': 'pool#abc', 'sk': '1_00', 'historia': 'expirada',
+                         'expira_em': int(time.time()) - 10})
+    assert story_cache.get_pooled_story('abc') is None